@@ -1,4 +1,5 @@
 import graphene
+from graphql import assert_valid_schema
 from crm.schema import Query as CRMQuery, Mutation as CRMMutation
 
 
@@ -23,3 +24,7 @@ class Mutation(CRMMutation, graphene.ObjectType):
 
 # Create schema
 schema = graphene.Schema(query=Query, mutation=Mutation)
+
+# Validate once at import, failing loudly on an invalid schema; graphql-core
+# caches the result on the schema, so the first request doesn't pay for it
+assert_valid_schema(schema.graphql_schema)
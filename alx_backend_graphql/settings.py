@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,6 +41,7 @@ INSTALLED_APPS = [
     # Third-party apps
     'graphene_django',
     'django_filters',
+    'cachalot',
     
     # Local apps
     'crm',
@@ -124,4 +126,27 @@ STATIC_URL = 'static/'
 # GraphQL Configuration
 GRAPHENE = {
     'SCHEMA': 'alx_backend_graphql.schema.schema',  # Points to our schema
+    # Cap page size, and nested lists such as customer.orders per parent,
+    # so a query never loads a whole table into memory
+    'RELAY_CONNECTION_MAX_LIMIT': 100,
 }
+
+# Shared cache (Redis), e.g. REDIS_URL=redis://127.0.0.1:6379/1
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Query result caching (django-cachalot)
+# Cached querysets are invalidated when the ORM writes to the tables they
+# read. Invalidation only reaches other worker processes through a shared
+# cache, so caching is enabled only when REDIS_URL is set; with the default
+# per-process LocMemCache other workers would keep serving stale rows.
+CACHALOT_ENABLED = bool(REDIS_URL)
+# crm_order is excluded because total_amount is updated by a database
+# trigger, which cachalot cannot see.
+CACHALOT_UNCACHABLE_TABLES = frozenset(('django_migrations', 'crm_order'))
@@ -4,8 +4,8 @@ URL Configuration for GraphQL CRM
 
 from django.contrib import admin
 from django.urls import path
-from graphene_django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
+from crm.views import CRMGraphQLView
 
 urlpatterns = [
     # Admin interface
@@ -14,5 +14,6 @@ urlpatterns = [
     # GraphQL endpoint
     # csrf_exempt: Disables CSRF protection for GraphQL (development only)
     # graphiql=True: Enables the GraphiQL interactive interface
-    path('graphql', csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    # CRMGraphQLView: Attaches per-request loader caches to the context
+    path('graphql', csrf_exempt(CRMGraphQLView.as_view(graphiql=True))),
 ]
@@ -1,8 +1,30 @@
 import django_filters
+from django.db.models import Exists, OuterRef
 from .models import Customer, Product, Order
 
 
-class CustomerFilter(django_filters.FilterSet):
+class CachedFormFilterSet(django_filters.FilterSet):
+    """
+    FilterSet that builds its form class once per FilterSet class
+    
+    The default FilterSet creates a new form class on every instance,
+    i.e. on every filtered GraphQL request. The form class only
+    depends on the declared filters, so it's safe to reuse; forms
+    still copy their fields per instance.
+    """
+    
+    def get_form_class(self):
+        cls = type(self)
+        # Look in the class's own __dict__ so subclasses (e.g. the ones
+        # graphene-django creates) get their own form class
+        form_class = cls.__dict__.get('_cached_form_class')
+        if form_class is None:
+            form_class = super().get_form_class()
+            cls._cached_form_class = form_class
+        return form_class
+
+
+class CustomerFilter(CachedFormFilterSet):
     """
     Filter for Customer model
     Allows searching by name, email, phone, and creation date
@@ -54,7 +76,7 @@ class CustomerFilter(django_filters.FilterSet):
         }
 
 
-class ProductFilter(django_filters.FilterSet):
+class ProductFilter(CachedFormFilterSet):
     """
     Filter for Product model
     Allows searching by name, price range, and stock levels
@@ -116,7 +138,7 @@ class ProductFilter(django_filters.FilterSet):
         }
 
 
-class OrderFilter(django_filters.FilterSet):
+class OrderFilter(CachedFormFilterSet):
     """
     Filter for Order model
     Allows searching by amount, date, customer name, and product name
@@ -157,19 +179,30 @@ class OrderFilter(django_filters.FilterSet):
     )
     
     # Filter by product name (related field, many-to-many)
+    # Uses an EXISTS subquery so orders never repeat and no DISTINCT is needed
     product_name = django_filters.CharFilter(
-        field_name='products__name',
-        lookup_expr='icontains',
+        method='filter_product_name',
         label='Product name contains'
     )
     
     # Filter by specific product ID
     product_id = django_filters.NumberFilter(
-        field_name='products__id',
-        lookup_expr='exact',
+        method='filter_product_id',
         label='Product ID'
     )
     
+    def filter_product_name(self, queryset, name, value):
+        """Custom method to filter orders containing a product whose name matches"""
+        return queryset.filter(
+            Exists(Product.objects.filter(orders=OuterRef('pk'), name__icontains=value))
+        )
+    
+    def filter_product_id(self, queryset, name, value):
+        """Custom method to filter orders containing a specific product"""
+        return queryset.filter(
+            Exists(Order.products.through.objects.filter(order=OuterRef('pk'), product_id=value))
+        )
+    
     class Meta:
         model = Order
         fields = {
@@ -0,0 +1,67 @@
+from .models import Customer, Product
+
+
+def batch_load_customers(keys, queryset=None):
+    """Load customers for the given IDs in one query, in key order"""
+    if queryset is None:
+        queryset = Customer.objects.all()
+    customers = queryset.in_bulk(keys)
+    return [customers.get(int(key)) for key in keys]
+
+
+def batch_load_products(keys, queryset=None):
+    """Load products for the given IDs in one query, in key order"""
+    if queryset is None:
+        # ProductNode never exposes updated_at, so don't transfer it
+        queryset = Product.objects.defer('updated_at')
+    products = queryset.in_bulk(keys)
+    return [products.get(int(key)) for key in keys]
+
+
+class RequestCache:
+    """
+    Per-request cache of lookups by key
+
+    There is no deferred batching: `load` fetches a miss right away,
+    and only an explicit `load_many` fetches several keys in one query.
+    What it saves is repeat lookups, e.g. many orders of one customer
+    or aliased node fields, which hit the database once per request.
+
+    `load_fn` receives a list of keys, plus the queryset to fetch them
+    from if the caller passed one, and must return the values in the
+    same order. Callers pass their node's get_queryset() so the usual
+    per-type filtering applies. Loaders hold results for the lifetime
+    of a single request, so create a fresh one per request rather than
+    sharing them at module level.
+    """
+
+    def __init__(self, load_fn):
+        self.load_fn = load_fn
+        self._cache = {}
+
+    def load(self, key, queryset=None):
+        """Return the value for a single key"""
+        return self.load_many([key], queryset=queryset)[0]
+
+    def load_many(self, keys, queryset=None):
+        """Return values for several keys, fetching all misses in one batch"""
+        keys = [int(key) for key in keys]
+        missing = list(dict.fromkeys(key for key in keys if key not in self._cache))
+        if missing:
+            self._cache.update(zip(missing, self.load_fn(missing, queryset=queryset)))
+        return [self._cache[key] for key in keys]
+
+    def prime(self, key, value):
+        """Store an already-fetched value so later loads skip the database"""
+        self._cache.setdefault(int(key), value)
+
+    def clear(self, key):
+        """Forget a cached key, e.g. after it was modified"""
+        self._cache.pop(int(key), None)
+
+
+def attach_loaders(context):
+    """Attach fresh loaders to a GraphQL request context"""
+    context.customer_loader = RequestCache(load_fn=batch_load_customers)
+    context.product_loader = RequestCache(load_fn=batch_load_products)
+    return context
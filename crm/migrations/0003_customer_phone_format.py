@@ -0,0 +1,23 @@
+import re
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0002_add_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='phone',
+            field=models.CharField(blank=True, max_length=17, null=True, validators=[django.core.validators.RegexValidator(message="Phone number must be in format: '+999999999' or '123-456-7890'", regex=re.compile('^\\+?1?\\d{9,15}$|^\\d{3}-\\d{3}-\\d{4}$'))]),
+        ),
+        migrations.AddConstraint(
+            model_name='customer',
+            constraint=models.CheckConstraint(condition=models.Q(('phone__regex', '^\\+?1?\\d{9,15}$|^\\d{3}-\\d{3}-\\d{4}$'), ('phone', ''), ('phone__isnull', True), _connector='OR'), name='customer_phone_format'),
+        ),
+    ]
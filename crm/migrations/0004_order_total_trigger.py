@@ -0,0 +1,91 @@
+from django.db import migrations
+
+
+# Recompute crm_order.total_amount whenever a product is added to or
+# removed from an order, so the stored total never goes stale
+TOTAL_SUBQUERY = """
+    SELECT COALESCE(SUM(p.price), 0)
+    FROM crm_product p
+    JOIN crm_order_products op ON op.product_id = p.id
+    WHERE op.order_id = {ref}.order_id
+"""
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE TRIGGER crm_order_products_total_insert
+    AFTER INSERT ON crm_order_products
+    FOR EACH ROW BEGIN
+        UPDATE crm_order SET total_amount = ({TOTAL_SUBQUERY.format(ref='NEW')})
+        WHERE id = NEW.order_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER crm_order_products_total_delete
+    AFTER DELETE ON crm_order_products
+    FOR EACH ROW BEGIN
+        UPDATE crm_order SET total_amount = ({TOTAL_SUBQUERY.format(ref='OLD')})
+        WHERE id = OLD.order_id;
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS crm_order_products_total_insert",
+    "DROP TRIGGER IF EXISTS crm_order_products_total_delete",
+]
+
+POSTGRESQL_FORWARD = [
+    f"""
+    CREATE OR REPLACE FUNCTION crm_order_refresh_total() RETURNS trigger AS $$
+    DECLARE
+        ref RECORD;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            ref := OLD;
+        ELSE
+            ref := NEW;
+        END IF;
+        UPDATE crm_order SET total_amount = ({TOTAL_SUBQUERY.format(ref='ref')})
+        WHERE id = ref.order_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER crm_order_products_total
+    AFTER INSERT OR DELETE ON crm_order_products
+    FOR EACH ROW EXECUTE FUNCTION crm_order_refresh_total()
+    """,
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP TRIGGER IF EXISTS crm_order_products_total ON crm_order_products",
+    "DROP FUNCTION IF EXISTS crm_order_refresh_total()",
+]
+
+
+def _run(schema_editor, statements_by_vendor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in statements_by_vendor:
+        raise NotImplementedError(f"Order total trigger is not implemented for {vendor}")
+    for statement in statements_by_vendor[vendor]:
+        schema_editor.execute(statement)
+
+
+def create_triggers(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD})
+
+
+def drop_triggers(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0003_customer_phone_format'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+# A CheckConstraint using phone__regex compiles to REGEXP on SQLite,
+# which only exists on Django's own connections, so `manage.py dbshell`
+# and other writers fail with "unknown function: REGEXP()". Enforce the
+# phone format in the database on PostgreSQL only, where ~ is built in.
+POSTGRESQL_FORWARD = r"""
+    ALTER TABLE crm_customer ADD CONSTRAINT customer_phone_format
+    CHECK (phone IS NULL OR phone = '' OR phone ~ '^\+?1?\d{9,15}$|^\d{3}-\d{3}-\d{4}$')
+"""
+
+POSTGRESQL_REVERSE = """
+    ALTER TABLE crm_customer DROP CONSTRAINT IF EXISTS customer_phone_format
+"""
+
+
+def add_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRESQL_FORWARD)
+
+
+def drop_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRESQL_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0004_order_total_trigger'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='customer',
+            name='customer_phone_format',
+        ),
+        migrations.RunPython(add_constraint, drop_constraint),
+    ]
@@ -1,8 +1,16 @@
+import re
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import Sum
 from django.core.validators import RegexValidator
 from django.utils import timezone
 
 
+# Phone format: +1234567890 or 123-456-7890
+PHONE_RE = re.compile(r'^\+?1?\d{9,15}$|^\d{3}-\d{3}-\d{4}$')
+
+
 class Customer(models.Model):
     """
     Customer model - stores customer information
@@ -12,7 +20,7 @@ class Customer(models.Model):
     
     # Phone validator: +1234567890 or 123-456-7890
     phone_regex = RegexValidator(
-        regex=r'^\+?1?\d{9,15}$|^\d{3}-\d{3}-\d{4}$',
+        regex=PHONE_RE,
         message="Phone number must be in format: '+999999999' or '123-456-7890'"
     )
     phone = models.CharField(
@@ -29,6 +37,14 @@ class Customer(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Customer'
         verbose_name_plural = 'Customers'
+        # Columns used by CustomerFilter (email is indexed via unique=True)
+        indexes = [
+            models.Index(fields=['name'], name='customer_name_idx'),
+            models.Index(fields=['created_at'], name='customer_created_at_idx'),
+        ]
+        # The phone format is also enforced by a PostgreSQL CHECK
+        # constraint (see migration 0005); it isn't declared here because
+        # SQLite can only evaluate REGEXP on Django's own connections
     
     def __str__(self):
         return f"{self.name} ({self.email})"
@@ -56,6 +72,12 @@ class Product(models.Model):
         ordering = ['name']
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
+        # Columns used by ProductFilter range lookups
+        indexes = [
+            models.Index(fields=['name'], name='product_name_idx'),
+            models.Index(fields=['price'], name='product_price_idx'),
+            models.Index(fields=['stock'], name='product_stock_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - ${self.price}"
@@ -89,13 +111,26 @@ class Order(models.Model):
         ordering = ['-order_date']
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
+        # Columns used by OrderFilter, plus the customer's orders by date
+        indexes = [
+            models.Index(fields=['order_date'], name='order_date_idx'),
+            models.Index(fields=['total_amount'], name='order_total_amount_idx'),
+            models.Index(fields=['customer', '-order_date'], name='order_customer_date_idx'),
+        ]
     
     def __str__(self):
         return f"Order #{self.id} - {self.customer.name}"
     
     def calculate_total(self):
-        """Calculate total amount from associated products"""
-        total = sum(product.price for product in self.products.all())
+        """
+        Calculate total amount from associated products
+
+        A database trigger already keeps total_amount up to date when
+        products are added or removed; call this after changing the
+        price of products that are already on orders.
+        """
+        # Sum in the database and write back only the total
+        total = self.products.aggregate(total=Sum('price'))['total'] or Decimal('0.00')
+        Order.objects.filter(pk=self.pk).update(total_amount=total)
         self.total_amount = total
-        self.save()
         return total
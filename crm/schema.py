@@ -1,11 +1,13 @@
 import graphene
+import graphene_django_optimizer as gql_optimizer
 from graphene import relay
 from graphene_django import DjangoObjectType
-from graphene_django.filter import DjangoFilterConnectionField
 from django.core.exceptions import ValidationError
-from django.db import transaction
-from .models import Customer, Product, Order
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from .models import Customer, Product, Order, PHONE_RE
 from .filters import CustomerFilter, ProductFilter, OrderFilter
+from .fields import KeysetFilterConnectionField, limit_nested_lists, nested_list_limit
 
 
 # ==========================================
@@ -19,6 +21,24 @@ class CustomerNode(DjangoObjectType):
         filterset_class = CustomerFilter
         interfaces = (relay.Node,)
         fields = ('id', 'name', 'email', 'phone', 'created_at', 'orders')
+    
+    # Keyset ordering for cursor pagination (see KeysetFilterConnectionField)
+    pagination_keyset = ('-created_at', '-id')
+    
+    @classmethod
+    def get_node(cls, info, id):
+        # Like OrderNode, prefetch what single-customer lookups usually
+        # read, so customer { orders { products } } is a fixed 3 queries
+        queryset = cls.get_queryset(limit_nested_lists(Customer.objects.prefetch_related(
+            Prefetch('orders', queryset=Order.objects.prefetch_related('products'))
+        )), info)
+        loader = getattr(info.context, 'customer_loader', None)
+        if loader is None:
+            try:
+                return queryset.get(pk=id)
+            except Customer.DoesNotExist:
+                return None
+        return loader.load(id, queryset=queryset)
 
 
 class ProductNode(DjangoObjectType):
@@ -28,6 +48,16 @@ class ProductNode(DjangoObjectType):
         filterset_class = ProductFilter
         interfaces = (relay.Node,)
         fields = ('id', 'name', 'price', 'stock', 'created_at')
+    
+    # Keyset ordering for cursor pagination (see KeysetFilterConnectionField)
+    pagination_keyset = ('name', 'id')
+    
+    @classmethod
+    def get_node(cls, info, id):
+        loader = getattr(info.context, 'product_loader', None)
+        if loader is None:
+            return super().get_node(info, id)
+        return loader.load(id, queryset=cls.get_queryset(Product.objects.defer('updated_at'), info))
 
 
 class OrderNode(DjangoObjectType):
@@ -37,6 +67,36 @@ class OrderNode(DjangoObjectType):
         filterset_class = OrderFilter
         interfaces = (relay.Node,)
         fields = ('id', 'customer', 'products', 'total_amount', 'order_date', 'created_at')
+    
+    # Keyset ordering for cursor pagination (see KeysetFilterConnectionField)
+    pagination_keyset = ('-order_date', '-id')
+    
+    @classmethod
+    def get_node(cls, info, id):
+        # Single-order lookups nearly always read the customer and products
+        queryset = Order.objects.select_related('customer').prefetch_related('products')
+        try:
+            return cls.get_queryset(queryset, info).get(pk=id)
+        except Order.DoesNotExist:
+            return None
+    
+    # model_field lets the optimizer join the customer and narrow its
+    # columns to the selected ones; customer_id stays in the only() list
+    # even when the customer isn't joined, so the loader can read it
+    @gql_optimizer.resolver_hints(model_field='customer', only=('customer_id',))
+    def resolve_customer(self, info):
+        # Orders sharing a customer reuse the one loaded for this request
+        loader = getattr(info.context, 'customer_loader', None)
+        if loader is None:
+            return self.customer
+        if Order.customer.is_cached(self):
+            # Already joined in by the optimizer, no query needed
+            loader.prime(self.customer_id, self.customer)
+            return self.customer
+        return loader.load(
+            self.customer_id,
+            queryset=CustomerNode.get_queryset(Customer.objects.all(), info),
+        )
 
 
 # Also keep the original types for mutations
@@ -52,6 +112,11 @@ class ProductType(DjangoObjectType):
     class Meta:
         model = Product
         fields = ('id', 'name', 'price', 'stock', 'created_at')
+    
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        # Backs nested lists such as order.products; cap them like a page
+        return _limit_list(queryset)
 
 
 class OrderType(DjangoObjectType):
@@ -59,6 +124,19 @@ class OrderType(DjangoObjectType):
     class Meta:
         model = Order
         fields = ('id', 'customer', 'products', 'total_amount', 'order_date', 'created_at')
+    
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        # Backs nested lists such as customer.orders; cap them like a page
+        return _limit_list(queryset)
+
+
+def _limit_list(queryset):
+    """Slice a nested list; prefetched results are sliced in memory"""
+    limit = nested_list_limit()
+    if limit is None or queryset.query.is_sliced:
+        return queryset
+    return queryset[:limit]
 
 
 # ==========================================
@@ -90,6 +168,24 @@ class OrderInput(graphene.InputObjectType):
 # Mutations (same as before)
 # ==========================================
 
+def validate_phone(phone):
+    """
+    Check a phone number without running the field's validators
+    
+    Stands in for full_clean() on the phone field, so it covers both the
+    format and max_length. fullmatch() is used because `$` in PHONE_RE
+    would also accept a trailing newline.
+    """
+    if not phone:
+        return
+    max_length = Customer._meta.get_field('phone').max_length
+    if len(phone) > max_length:
+        raise ValidationError(
+            {'phone': f"Phone number must be at most {max_length} characters"}
+        )
+    if not PHONE_RE.fullmatch(phone):
+        raise ValidationError({'phone': Customer.phone_regex.message})
+
 class CreateCustomer(graphene.Mutation):
     """Mutation to create a single customer"""
     class Arguments:
@@ -101,17 +197,23 @@ class CreateCustomer(graphene.Mutation):
     @staticmethod
     def mutate(root, info, input):
         try:
-            if Customer.objects.filter(email=input.email).exists():
-                raise ValidationError("Email already exists")
+            phone = input.get('phone')
+            validate_phone(phone)
             
             customer = Customer(
                 name=input.name,
                 email=input.email,
-                phone=input.get('phone')
+                phone=phone
             )
             
-            customer.full_clean()
-            customer.save()
+            # Email uniqueness is left to the unique constraint on insert,
+            # which is a single round-trip and safe under concurrent creates
+            customer.full_clean(exclude=['phone'], validate_unique=False)
+            try:
+                with transaction.atomic():
+                    customer.save()
+            except IntegrityError:
+                raise ValidationError("Email already exists")
             
             return CreateCustomer(
                 customer=customer,
@@ -132,31 +234,52 @@ class BulkCreateCustomers(graphene.Mutation):
     
     @staticmethod
     def mutate(root, info, input):
-        customers_created = []
         errors = []
         
+        # Look up every already-registered email in a single query
+        incoming_emails = [customer_data.email for customer_data in input]
+        taken = set(
+            Customer.objects.filter(email__in=incoming_emails)
+            .values_list('email', flat=True)
+        )
+        
+        to_create = []
         for idx, customer_data in enumerate(input):
             try:
-                if Customer.objects.filter(email=customer_data.email).exists():
+                if customer_data.email in taken:
                     errors.append(f"Row {idx + 1}: Email {customer_data.email} already exists")
                     continue
                 
+                phone = customer_data.get('phone')
+                validate_phone(phone)
+                
                 customer = Customer(
                     name=customer_data.name,
                     email=customer_data.email,
-                    phone=customer_data.get('phone')
+                    phone=phone
                 )
                 
-                customer.full_clean()
-                customer.save()
+                # Phone and uniqueness were checked above, so skip the
+                # per-row validator and DB lookups for them
+                customer.full_clean(exclude=['phone'], validate_unique=False)
                 
-                customers_created.append(customer)
+                to_create.append(customer)
+                # Later rows repeating this email are rejected as duplicates
+                taken.add(customer.email)
             
             except ValidationError as e:
                 errors.append(f"Row {idx + 1}: {str(e)}")
             except Exception as e:
                 errors.append(f"Row {idx + 1}: {str(e)}")
         
+        try:
+            with transaction.atomic():
+                customers_created = Customer.objects.bulk_create(to_create, batch_size=500)
+        except IntegrityError:
+            # Another request registered one of these emails after the check above
+            customers_created = []
+            errors.append("Some emails were registered concurrently; no customers were created")
+        
         return BulkCreateCustomers(
             customers=customers_created,
             errors=errors if errors else None
@@ -219,22 +342,33 @@ class CreateOrder(graphene.Mutation):
             if not input.product_ids or len(input.product_ids) == 0:
                 raise ValidationError("At least one product must be selected")
             
-            products = []
+            requested_ids = set()
             for product_id in input.product_ids:
                 try:
-                    product = Product.objects.get(pk=product_id)
-                    products.append(product)
-                except Product.DoesNotExist:
+                    requested_ids.add(int(product_id))
+                except (TypeError, ValueError):
                     raise ValidationError(f"Product with ID {product_id} does not exist")
             
+            # Check every product in one query, loading only their IDs
+            product_ids = set(
+                Product.objects.filter(id__in=requested_ids)
+                .values_list('id', flat=True)
+            )
+            missing = requested_ids - product_ids
+            if missing:
+                missing_ids = ", ".join(str(pk) for pk in sorted(missing))
+                raise ValidationError(f"Product(s) with ID {missing_ids} do not exist")
+            
             order = Order(
                 customer=customer,
                 order_date=input.get('order_date')
             )
             order.save()
             
-            order.products.set(products)
-            order.calculate_total()
+            # total_amount is maintained by a database trigger on the
+            # order/product link table, so just read back the result
+            order.products.set(product_ids)
+            order.refresh_from_db(fields=['total_amount'])
             
             return CreateOrder(
                 order=order,
@@ -254,10 +388,11 @@ class Query(graphene.ObjectType):
     CRM queries with filtering support
     """
     
-    # Filtered queries using DjangoFilterConnectionField
-    all_customers = DjangoFilterConnectionField(CustomerNode)
-    all_products = DjangoFilterConnectionField(ProductNode)
-    all_orders = DjangoFilterConnectionField(OrderNode)
+    # Filtered queries, optimized from the requested fields and
+    # paginated by keyset rather than OFFSET
+    all_customers = KeysetFilterConnectionField(CustomerNode)
+    all_products = KeysetFilterConnectionField(ProductNode)
+    all_orders = KeysetFilterConnectionField(OrderNode)
     
     # Single item queries
     customer = relay.Node.Field(CustomerNode)
@@ -1,3 +1,549 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from graphene_django.utils.testing import GraphQLTestCase
+from graphql_relay import from_global_id, to_global_id
+
+from .filters import OrderFilter
+from .loaders import RequestCache, batch_load_customers
+from .models import Customer, Product, Order
+from .schema import OrderNode, ProductNode
+
+
+class CRMGraphQLTestCase(GraphQLTestCase):
+    """Base test case posting queries to the CRM GraphQL endpoint"""
+    GRAPHQL_URL = '/graphql'
+
+    def execute(self, query, variables=None):
+        """Run a query and return the decoded JSON body"""
+        response = self.query(query, variables=variables)
+        return json.loads(response.content)
+
+
+class NodeRelationTests(CRMGraphQLTestCase):
+    """Nodes fetched through the loader caches must still resolve nested relations"""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        self.keyboard = Product.objects.create(name='Keyboard', price=Decimal('50.00'), stock=5)
+        self.mouse = Product.objects.create(name='Mouse', price=Decimal('20.00'), stock=5)
+        self.order = Order.objects.create(customer=self.customer)
+        self.order.products.set([self.keyboard, self.mouse])
+
+    def test_customer_node_resolves_orders_and_products(self):
+        content = self.execute('''
+            query ($id: ID!) {
+                customer(id: $id) {
+                    name
+                    orders { id products { name } }
+                }
+            }
+        ''', variables={'id': to_global_id('CustomerNode', self.customer.pk)})
+
+        self.assertNotIn('errors', content)
+        customer = content['data']['customer']
+        self.assertEqual(customer['name'], 'Alice')
+        self.assertEqual(len(customer['orders']), 1)
+        names = {product['name'] for product in customer['orders'][0]['products']}
+        self.assertEqual(names, {'Keyboard', 'Mouse'})
+
+    def test_customer_node_query_count_does_not_grow_with_orders(self):
+        for _ in range(3):
+            Order.objects.create(customer=self.customer).products.set([self.keyboard, self.mouse])
+        query = '''
+            query ($id: ID!) { customer(id: $id) { orders { id products { name } } } }
+        '''
+        # Customer, its orders, and their products
+        with self.assertNumQueries(3):
+            content = self.execute(query, variables={'id': to_global_id('CustomerNode', self.customer.pk)})
+
+        self.assertNotIn('errors', content)
+        self.assertEqual(len(content['data']['customer']['orders']), 4)
+
+    def test_order_node_resolves_customer_and_its_orders(self):
+        content = self.execute('''
+            query ($id: ID!) {
+                order(id: $id) {
+                    customer { name orders { id } }
+                }
+            }
+        ''', variables={'id': to_global_id('OrderNode', self.order.pk)})
+
+        self.assertNotIn('errors', content)
+        customer = content['data']['order']['customer']
+        self.assertEqual(customer['name'], 'Alice')
+        self.assertEqual(len(customer['orders']), 1)
+
+    def test_orders_connection_resolves_customer_relations(self):
+        content = self.execute('''
+            {
+                allOrders {
+                    edges { node { customer { email orders { id } } } }
+                }
+            }
+        ''')
+
+        self.assertNotIn('errors', content)
+        node = content['data']['allOrders']['edges'][0]['node']
+        self.assertEqual(node['customer']['email'], 'alice@example.com')
+        self.assertEqual(len(node['customer']['orders']), 1)
+
+    def test_orders_connection_joins_only_selected_customer_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            content = self.execute('''
+                { allOrders { edges { node { customer { name } } } } }
+            ''')
+
+        self.assertNotIn('errors', content)
+        self.assertEqual(content['data']['allOrders']['edges'][0]['node']['customer']['name'], 'Alice')
+        joins = [query['sql'] for query in queries.captured_queries if 'JOIN "crm_customer"' in query['sql']]
+        self.assertEqual(len(joins), 1)
+        self.assertIn('"crm_customer"."name"', joins[0])
+        self.assertNotIn('"crm_customer"."email"', joins[0])
+
+
+@override_settings(GRAPHENE={
+    'SCHEMA': 'alx_backend_graphql.schema.schema',
+    'RELAY_CONNECTION_MAX_LIMIT': 2,
+})
+class NestedListLimitTests(CRMGraphQLTestCase):
+    """Nested lists are capped at RELAY_CONNECTION_MAX_LIMIT rows per parent"""
+
+    def setUp(self):
+        products = [
+            Product.objects.create(name=f'Product {i}', price=Decimal('1.00'), stock=1)
+            for i in range(3)
+        ]
+        for name in ['Alice', 'Bob']:
+            customer = Customer.objects.create(name=name, email=f'{name.lower()}@example.com')
+            for _ in range(3):
+                order = Order.objects.create(customer=customer)
+                order.products.set(products)
+
+    def assert_capped(self, customers):
+        for customer in customers:
+            self.assertEqual(len(customer['orders']), 2)
+            for order in customer['orders']:
+                self.assertEqual(len(order['products']), 2)
+
+    def test_prefetched_nested_lists_are_capped_per_parent(self):
+        with CaptureQueriesContext(connection) as queries:
+            content = self.execute('''
+                { allCustomers { edges { node { orders { id products { name } } } } } }
+            ''')
+
+        self.assertNotIn('errors', content)
+        self.assert_capped([edge['node'] for edge in content['data']['allCustomers']['edges']])
+        # The cap is applied in SQL, not after loading every row
+        prefetches = [query['sql'] for query in queries.captured_queries if 'ROW_NUMBER' in query['sql']]
+        self.assertEqual(len(prefetches), 2)
+
+    def test_customer_node_nested_lists_are_capped(self):
+        alice = Customer.objects.get(name='Alice')
+        content = self.execute('''
+            query ($id: ID!) { customer(id: $id) { orders { id products { name } } } }
+        ''', variables={'id': to_global_id('CustomerNode', alice.pk)})
+
+        self.assertNotIn('errors', content)
+        self.assert_capped([content['data']['customer']])
+
+
+class KeysetPaginationTests(CRMGraphQLTestCase):
+    """allProducts/allOrders paginate by keyset, including rows with tied keys"""
+
+    PRODUCTS_PAGE = '''
+        query ($first: Int, $after: String, $last: Int, $before: String, $offset: Int) {
+            allProducts(first: $first, after: $after, last: $last, before: $before, offset: $offset) {
+                edges { node { id name } }
+                pageInfo { startCursor endCursor hasNextPage hasPreviousPage }
+            }
+        }
+    '''
+
+    ORDERS_PAGE = '''
+        query ($first: Int, $after: String) {
+            allOrders(first: $first, after: $after) {
+                edges { node { id } }
+                pageInfo { endCursor hasNextPage }
+            }
+        }
+    '''
+
+    def setUp(self):
+        # Duplicate names/dates make the id tie-breaker decide the order
+        for name in ['Mouse', 'Cable', 'Mouse', 'Cable', 'Keyboard', 'Mouse', 'Cable']:
+            Product.objects.create(name=name, price=Decimal('10.00'), stock=1)
+        customer = Customer.objects.create(name='Bob', email='bob@example.com')
+        order_date = timezone.now()
+        for _ in range(5):
+            Order.objects.create(customer=customer, order_date=order_date)
+        Order.objects.create(customer=customer, order_date=order_date - timedelta(days=1))
+
+    def node_ids(self, connection):
+        return [from_global_id(edge['node']['id'])[1] for edge in connection['edges']]
+
+    def expected_ids(self, queryset, keyset):
+        return [str(pk) for pk in queryset.order_by(*keyset).values_list('pk', flat=True)]
+
+    def page_products(self, **variables):
+        content = self.execute(self.PRODUCTS_PAGE, variables=variables)
+        self.assertNotIn('errors', content)
+        return content['data']['allProducts']
+
+    def test_products_forward_pages_match_keyset_order(self):
+        ids, after = [], None
+        while True:
+            page = self.page_products(first=2, after=after)
+            ids += self.node_ids(page)
+            if not page['pageInfo']['hasNextPage']:
+                break
+            after = page['pageInfo']['endCursor']
+
+        self.assertEqual(ids, self.expected_ids(Product.objects.all(), ProductNode.pagination_keyset))
+
+    def test_products_backward_pages_match_keyset_order(self):
+        ids, before = [], None
+        while True:
+            page = self.page_products(last=2, before=before)
+            ids = self.node_ids(page) + ids
+            if not page['pageInfo']['hasPreviousPage']:
+                break
+            before = page['pageInfo']['startCursor']
+
+        self.assertEqual(ids, self.expected_ids(Product.objects.all(), ProductNode.pagination_keyset))
+
+    def test_orders_forward_pages_match_keyset_order(self):
+        ids, after = [], None
+        while True:
+            content = self.execute(self.ORDERS_PAGE, variables={'first': 2, 'after': after})
+            self.assertNotIn('errors', content)
+            page = content['data']['allOrders']
+            ids += self.node_ids(page)
+            if not page['pageInfo']['hasNextPage']:
+                break
+            after = page['pageInfo']['endCursor']
+
+        self.assertEqual(ids, self.expected_ids(Order.objects.all(), OrderNode.pagination_keyset))
+
+    def test_cursor_columns_are_loaded_with_optimizer_only(self):
+        # Only `id` is selected, so the optimizer's only() would drop
+        # order_date; building cursors must not lazy-load it per row.
+        # One COUNT for the connection length plus one page query.
+        with self.assertNumQueries(2):
+            content = self.execute(self.ORDERS_PAGE, variables={'first': 6})
+        self.assertNotIn('errors', content)
+        self.assertEqual(len(content['data']['allOrders']['edges']), 6)
+
+    def test_invalid_cursor_is_rejected(self):
+        content = self.execute(self.PRODUCTS_PAGE, variables={'first': 2, 'after': 'not-a-cursor'})
+        self.assertIn('Invalid cursor', content['errors'][0]['message'])
+
+    def test_offset_with_cursor_is_rejected(self):
+        after = self.page_products(first=2)['pageInfo']['endCursor']
+        content = self.execute(self.PRODUCTS_PAGE, variables={'offset': 1, 'after': after})
+        self.assertEqual(
+            content['errors'][0]['message'],
+            "offset cannot be combined with after/before cursors",
+        )
+
+    def test_offset_alone_starts_at_that_position(self):
+        page = self.page_products(offset=2, first=3)
+        expected = self.expected_ids(Product.objects.all(), ProductNode.pagination_keyset)
+        self.assertEqual(self.node_ids(page), expected[2:5])
+        self.assertTrue(page['pageInfo']['hasPreviousPage'])
+
+    def test_offset_page_cursor_continues_with_after(self):
+        expected = self.expected_ids(Product.objects.all(), ProductNode.pagination_keyset)
+        page = self.page_products(offset=1, first=2)
+        self.assertEqual(self.node_ids(page), expected[1:3])
+
+        page = self.page_products(first=2, after=page['pageInfo']['endCursor'])
+        self.assertEqual(self.node_ids(page), expected[3:5])
+
+
+class RequestCacheTests(CRMGraphQLTestCase):
+    """Per-request loaders cache customer/product lookups"""
+
+    def setUp(self):
+        self.alice = Customer.objects.create(name='Alice', email='alice@example.com')
+        self.bob = Customer.objects.create(name='Bob', email='bob@example.com')
+
+    def test_aliased_customer_lookups_share_one_in_query(self):
+        customer_id = to_global_id('CustomerNode', self.alice.pk)
+        with CaptureQueriesContext(connection) as queries:
+            content = self.execute('''
+                query ($id: ID!) {
+                    first: customer(id: $id) { name }
+                    second: customer(id: $id) { email }
+                }
+            ''', variables={'id': customer_id})
+
+        self.assertNotIn('errors', content)
+        self.assertEqual(content['data']['first']['name'], 'Alice')
+        self.assertEqual(content['data']['second']['email'], 'alice@example.com')
+        customer_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "crm_customer"' in query['sql']
+        ]
+        self.assertEqual(len(customer_queries), 1)
+        self.assertIn(' IN (', customer_queries[0])
+
+    def test_load_many_fetches_all_keys_in_one_query(self):
+        loader = RequestCache(load_fn=batch_load_customers)
+        with self.assertNumQueries(1):
+            customers = loader.load_many([self.bob.pk, self.alice.pk, self.bob.pk])
+        self.assertEqual(customers, [self.bob, self.alice, self.bob])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(loader.load(str(self.alice.pk)), self.alice)
+
+    def test_load_missing_key_returns_none(self):
+        loader = RequestCache(load_fn=batch_load_customers)
+        self.assertIsNone(loader.load(self.bob.pk + 1000))
+
+    def test_missing_customer_node_is_null(self):
+        content = self.execute('''
+            query ($id: ID!) { customer(id: $id) { name } }
+        ''', variables={'id': to_global_id('CustomerNode', self.bob.pk + 1000)})
+
+        self.assertNotIn('errors', content)
+        self.assertIsNone(content['data']['customer'])
+
+    def test_loaders_are_not_shared_between_requests(self):
+        query = '''
+            query ($id: ID!) { customer(id: $id) { name } }
+        '''
+        variables = {'id': to_global_id('CustomerNode', self.alice.pk)}
+        self.execute(query, variables=variables)
+        Customer.objects.filter(pk=self.alice.pk).update(name='Alicia')
+
+        content = self.execute(query, variables=variables)
+        self.assertEqual(content['data']['customer']['name'], 'Alicia')
+
+    def test_loaded_nodes_respect_get_queryset(self):
+        product = Product.objects.create(name='Hidden', price=Decimal('1.00'), stock=1)
+        hide_all = classmethod(lambda cls, queryset, info: queryset.none())
+        with mock.patch.object(ProductNode, 'get_queryset', hide_all):
+            content = self.execute('''
+                query ($id: ID!) { product(id: $id) { name } }
+            ''', variables={'id': to_global_id('ProductNode', product.pk)})
+
+        self.assertNotIn('errors', content)
+        self.assertIsNone(content['data']['product'])
+
+
+class OrderFilterTests(CRMGraphQLTestCase):
+    """productName/productId filter orders without duplicating them"""
+
+    ORDERS = '''
+        query ($productName: String, $productId: Decimal) {
+            allOrders(productName: $productName, productId: $productId) {
+                edges { node { id } }
+            }
+        }
+    '''
+
+    def setUp(self):
+        customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        self.keyboard = Product.objects.create(name='Keyboard', price=Decimal('50.00'), stock=5)
+        self.cover = Product.objects.create(name='Keyboard Cover', price=Decimal('5.00'), stock=5)
+        mouse = Product.objects.create(name='Mouse', price=Decimal('20.00'), stock=5)
+        self.both = Order.objects.create(customer=customer)
+        self.both.products.set([self.keyboard, self.cover])
+        self.keyboard_only = Order.objects.create(customer=customer)
+        self.keyboard_only.products.set([self.keyboard, mouse])
+        Order.objects.create(customer=customer).products.set([mouse])
+
+    def order_ids(self, **variables):
+        content = self.execute(self.ORDERS, variables=variables)
+        self.assertNotIn('errors', content)
+        return [from_global_id(edge['node']['id'])[1] for edge in content['data']['allOrders']['edges']]
+
+    def test_product_name_matching_two_products_lists_order_once(self):
+        ids = self.order_ids(productName='keyboard')
+
+        self.assertCountEqual(ids, [str(self.both.pk), str(self.keyboard_only.pk)])
+        self.assertEqual(OrderFilter({'product_name': 'keyboard'}, queryset=Order.objects.all()).qs.count(), 2)
+
+    def test_product_id_filters_orders(self):
+        ids = self.order_ids(productId=str(self.cover.pk))
+
+        self.assertEqual(ids, [str(self.both.pk)])
+        self.assertEqual(OrderFilter({'product_id': self.keyboard.pk}, queryset=Order.objects.all()).qs.count(), 2)
+
+
+class OrderTotalTriggerTests(CRMGraphQLTestCase):
+    """The crm_order_products triggers keep Order.total_amount in sync"""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        self.keyboard = Product.objects.create(name='Keyboard', price=Decimal('50.00'), stock=5)
+        self.mouse = Product.objects.create(name='Mouse', price=Decimal('20.50'), stock=5)
+
+    def test_adding_and_removing_products_updates_total(self):
+        order = Order.objects.create(customer=self.customer)
+
+        order.products.add(self.keyboard, self.mouse)
+        order.refresh_from_db(fields=['total_amount'])
+        self.assertEqual(order.total_amount, Decimal('70.50'))
+
+        order.products.remove(self.keyboard)
+        order.refresh_from_db(fields=['total_amount'])
+        self.assertEqual(order.total_amount, Decimal('20.50'))
+
+        order.products.clear()
+        order.refresh_from_db(fields=['total_amount'])
+        self.assertEqual(order.total_amount, Decimal('0.00'))
+
+    def test_calculate_total_picks_up_price_changes(self):
+        order = Order.objects.create(customer=self.customer)
+        order.products.set([self.keyboard])
+        Product.objects.filter(pk=self.keyboard.pk).update(price=Decimal('45.00'))
+
+        self.assertEqual(order.calculate_total(), Decimal('45.00'))
+        order.refresh_from_db(fields=['total_amount'])
+        self.assertEqual(order.total_amount, Decimal('45.00'))
+
+    def test_create_order_returns_trigger_total(self):
+        content = self.execute('''
+            mutation ($input: OrderInput!) {
+                createOrder(input: $input) { order { totalAmount } message }
+            }
+        ''', variables={'input': {
+            'customerId': self.customer.pk,
+            'productIds': [self.keyboard.pk, self.mouse.pk],
+            'orderDate': timezone.now().isoformat(),
+        }})
+
+        self.assertNotIn('errors', content)
+        order = content['data']['createOrder']['order']
+        self.assertEqual(Decimal(order['totalAmount']), Decimal('70.50'))
+
+    def test_create_order_lists_all_missing_products(self):
+        content = self.execute('''
+            mutation ($input: OrderInput!) {
+                createOrder(input: $input) { order { id } }
+            }
+        ''', variables={'input': {
+            'customerId': self.customer.pk,
+            'productIds': [self.keyboard.pk, 9998, 9999],
+            'orderDate': timezone.now().isoformat(),
+        }})
+
+        self.assertIn('9998, 9999', content['errors'][0]['message'])
+        self.assertFalse(Order.objects.exists())
+
+    def test_create_order_rejects_null_and_non_numeric_product_ids(self):
+        for product_id, message in [(None, 'Product with ID None'), ('abc', 'Product with ID abc')]:
+            content = self.execute('''
+                mutation ($input: OrderInput!) {
+                    createOrder(input: $input) { order { id } }
+                }
+            ''', variables={'input': {
+                'customerId': self.customer.pk,
+                'productIds': [self.keyboard.pk, product_id],
+            }})
+
+            self.assertIn(message, content['errors'][0]['message'])
+        self.assertFalse(Order.objects.exists())
+
+
+class CustomerMutationTests(CRMGraphQLTestCase):
+    """createCustomer and bulkCreateCustomers validation and inserts"""
+
+    CREATE_CUSTOMER = '''
+        mutation ($input: CustomerInput!) {
+            createCustomer(input: $input) { customer { id email } message }
+        }
+    '''
+
+    BULK_CREATE_CUSTOMERS = '''
+        mutation ($input: [CustomerInput]!) {
+            bulkCreateCustomers(input: $input) { customers { id email } errors }
+        }
+    '''
+
+    def setUp(self):
+        Customer.objects.create(name='Alice', email='alice@example.com')
+
+    def test_bulk_create_inserts_valid_rows_and_reports_the_rest(self):
+        content = self.execute(self.BULK_CREATE_CUSTOMERS, variables={'input': [
+            {'name': 'Bob', 'email': 'bob@example.com', 'phone': '+1234567890'},
+            {'name': 'Alice Again', 'email': 'alice@example.com'},
+            {'name': 'Bob Again', 'email': 'bob@example.com'},
+            {'name': 'Carol', 'email': 'carol@example.com', 'phone': '1234567890\n'},
+            {'name': 'Dave', 'email': 'not-an-email'},
+            {'name': 'Erin', 'email': 'erin@example.com', 'phone': '123-456-7890'},
+        ]})
+
+        self.assertNotIn('errors', content)
+        result = content['data']['bulkCreateCustomers']
+        self.assertEqual(
+            [customer['email'] for customer in result['customers']],
+            ['bob@example.com', 'erin@example.com'],
+        )
+        self.assertTrue(all(customer['id'] for customer in result['customers']))
+        self.assertEqual(
+            [error.split(':')[0] for error in result['errors']],
+            ['Row 2', 'Row 3', 'Row 4', 'Row 5'],
+        )
+        self.assertEqual(Customer.objects.count(), 3)
+
+    def test_bulk_create_uses_constant_number_of_queries(self):
+        rows = [
+            {'name': f'Customer {i}', 'email': f'customer{i}@example.com'}
+            for i in range(20)
+        ]
+        # One lookup for existing emails, then SAVEPOINT, the bulk INSERT
+        # and RELEASE, regardless of the number of rows
+        with self.assertNumQueries(4):
+            content = self.execute(self.BULK_CREATE_CUSTOMERS, variables={'input': rows})
+        self.assertNotIn('errors', content)
+        self.assertEqual(len(content['data']['bulkCreateCustomers']['customers']), 20)
+
+    def test_create_customer(self):
+        content = self.execute(self.CREATE_CUSTOMER, variables={'input': {
+            'name': 'Bob', 'email': 'bob@example.com', 'phone': '123-456-7890',
+        }})
+
+        self.assertNotIn('errors', content)
+        self.assertEqual(content['data']['createCustomer']['customer']['email'], 'bob@example.com')
+        self.assertTrue(Customer.objects.filter(email='bob@example.com').exists())
+
+    def test_create_customer_duplicate_email_is_rejected(self):
+        content = self.execute(self.CREATE_CUSTOMER, variables={'input': {
+            'name': 'Alice Again', 'email': 'alice@example.com',
+        }})
+
+        self.assertIn('Email already exists', content['errors'][0]['message'])
+        self.assertEqual(Customer.objects.filter(email='alice@example.com').count(), 1)
+
+    def test_create_customer_phone_with_trailing_newline_is_rejected(self):
+        content = self.execute(self.CREATE_CUSTOMER, variables={'input': {
+            'name': 'Bob', 'email': 'bob@example.com', 'phone': '+1234567890123456\n',
+        }})
+
+        self.assertIn('errors', content)
+        self.assertFalse(Customer.objects.filter(email='bob@example.com').exists())
+
+    def test_create_customer_phone_too_long_is_rejected(self):
+        content = self.execute(self.CREATE_CUSTOMER, variables={'input': {
+            'name': 'Bob', 'email': 'bob@example.com', 'phone': '+1' + '2' * 16,
+        }})
+
+        self.assertIn('at most 17 characters', content['errors'][0]['message'])
+        self.assertFalse(Customer.objects.filter(email='bob@example.com').exists())
+
+    def test_create_customer_invalid_phone_is_rejected(self):
+        content = self.execute(self.CREATE_CUSTOMER, variables={'input': {
+            'name': 'Bob', 'email': 'bob@example.com', 'phone': '12ab',
+        }})
+
+        self.assertIn('Phone number must be in format', content['errors'][0]['message'])
+        self.assertFalse(Customer.objects.filter(email='bob@example.com').exists())
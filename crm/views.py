@@ -1,3 +1,10 @@
-from django.shortcuts import render
+from graphene_django.views import GraphQLView
 
-# Create your views here.
+from .loaders import attach_loaders
+
+
+class CRMGraphQLView(GraphQLView):
+    """GraphQL view that gives every request its own loader caches"""
+
+    def get_context(self, request):
+        return attach_loaders(super().get_context(request))